@@ -1,7 +1,22 @@
-import requests
+import asyncio
+import os
+import random
+import re
+import shutil
+import threading
 import time
+from urllib.parse import urlencode
+
+import diskcache
+import httpx
+import orjson
+import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
+from oauthlib.oauth1 import Client as OAuth1Client
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth1
 
 # -----------------------
@@ -17,6 +32,19 @@ OAUTH_TOKEN = st.secrets["discogs"]["OAUTH_TOKEN"]
 OAUTH_TOKEN_SECRET = st.secrets["discogs"]["OAUTH_TOKEN_SECRET"]
 USERNAME = "Niolu"
 FOLDER_ID = 0
+CACHE_DIR = "collection_cache"
+
+# Parsed JSON responses keyed by URL+params; release metadata is static, so
+# a hit skips both the network round-trip and json parsing on reruns.
+JSON_CACHE = diskcache.Cache(".discogs_cache")
+
+# Instance custom fields can be edited on Discogs, so their cache entries
+# expire after a week instead of living forever like release metadata.
+INSTANCE_FIELDS_TTL = 7 * 86400
+
+
+def _cache_key(url, params=None):
+    return (url, tuple(sorted((params or {}).items())))
 
 # -----------------------
 # Auth setup
@@ -30,39 +58,146 @@ auth = OAuth1(
 
 headers = {"User-Agent": USER_AGENT}
 
+# One pooled session for all sync calls: TLS handshakes happen once per
+# connection instead of once per request.
+SESSION = requests.Session()
+SESSION.headers.update(headers)
+SESSION.auth = auth
+SESSION.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
+# OAuth1 signer for the async paths (httpx has no requests_oauthlib equivalent)
+oauth_signer = OAuth1Client(
+    CONSUMER_KEY,
+    client_secret=CONSUMER_SECRET,
+    resource_owner_key=OAUTH_TOKEN,
+    resource_owner_secret=OAUTH_TOKEN_SECRET,
+)
+
+# Discogs allows 60 authenticated requests/minute; keep a few in-flight at once
+# and back off only when the remaining budget reported by the API runs low.
+PAGE_CONCURRENCY = 5
+RATE_LIMIT_THRESHOLD = 5
+INSTANCE_CONCURRENCY = 25
+RELEASE_CONCURRENCY = 10
+
+class TokenBucket:
+    """Discogs 60 req/min budget shared across worker threads.
+
+    Only blocks when the bucket is empty, so requests burst while headroom
+    exists; the fill level is re-synced from the API's
+    X-Discogs-Ratelimit-Remaining header after every response.
+    """
+
+    def __init__(self, capacity=60, refill_rate=1.0):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # tokens per second
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+                self.last_refill = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+    def sync_from_header(self, remaining):
+        with self._lock:
+            self.tokens = min(self.tokens, float(remaining))
+
+
+BUCKET = TokenBucket(capacity=60, refill_rate=1.0)
+
+# Retry schedule for transient failures: capped exponential backoff with
+# jitter so concurrent workers don't retry in lockstep.
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+BACKOFF_JITTER = 0.5
+
+
+def _backoff_delay(attempt):
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * (1 + random.uniform(0, BACKOFF_JITTER))
+
 # -----------------------
 # Safe request wrapper
 # -----------------------
-def safe_request(url, params=None, progress=None):
-    """Perform a GET request with automatic handling of Discogs rate limits (429)."""
-    while True:
-        resp = requests.get(url, headers=headers, params=params, auth=auth)
+def safe_request(url, params=None, progress=None, use_cache=True, expire=None):
+    """Perform a GET request with retries for rate limits and transient errors.
+
+    429s honor Retry-After when present; 5xx and connection errors back off
+    exponentially with jitter and give up after MAX_RETRIES. Responses are
+    stored in the on-disk JSON cache (optionally expiring after `expire`
+    seconds); pass use_cache=False for endpoints that must always be fetched
+    fresh (e.g. the first collection page).
+    """
+    key = _cache_key(url, params)
+    if use_cache and key in JSON_CACHE:
+        return JSON_CACHE[key]
 
-        if resp.status_code == 429:  # Too Many Requests
-            reset_after = int(resp.headers.get("Retry-After", 60))
-            msg = f"⚠️ Rate limit hit. Pausing for {reset_after} seconds..."
+    attempt = 0
+    while True:
+        BUCKET.consume()
+        try:
+            resp = SESSION.get(url, params=params)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"⚠️ {type(e).__name__} on {url}; retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                resp.raise_for_status()
+            if resp.status_code == 429 and "Retry-After" in resp.headers:
+                delay = int(resp.headers["Retry-After"])
+            else:
+                delay = _backoff_delay(attempt)
+            msg = f"⚠️ HTTP {resp.status_code} from Discogs; retry {attempt}/{MAX_RETRIES} in {delay:.1f}s"
             print(msg)
             if progress:
                 progress.text(msg)
-            time.sleep(reset_after)
-            continue  # retry after sleeping
+            time.sleep(delay)
+            continue
 
         resp.raise_for_status()
-        return resp.json()
+
+        remaining = resp.headers.get("X-Discogs-Ratelimit-Remaining")
+        if remaining is not None:
+            BUCKET.sync_from_header(remaining)
+
+        data = orjson.loads(resp.content)  # parses straight from bytes, ~3x stdlib json
+        JSON_CACHE.set(key, data, expire=expire)
+        return data
 
 # -----------------------
 # API helpers
 # -----------------------
-def get_collection_folder_releases(username, folder_id=0, page=1, per_page=250, progress=None):
+def get_collection_folder_releases(username, folder_id=0, page=1, per_page=250,
+                                   sort=None, sort_order=None, progress=None, use_cache=True):
     url = f"{BASE_URL}/users/{username}/collection/folders/{folder_id}/releases"
     params = {"page": page, "per_page": per_page}
-    return safe_request(url, params=params, progress=progress)
+    if sort:
+        params["sort"] = sort
+        params["sort_order"] = sort_order or "desc"
+    return safe_request(url, params=params, progress=progress, use_cache=use_cache)
 
 
-def get_custom_fields_map(username, progress=None):
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_custom_fields_map(username, _progress=None):
     url = f"{BASE_URL}/users/{username}/collection/fields"
     try:
-        fields = safe_request(url, progress=progress).get("fields", [])
+        fields = safe_request(url, progress=_progress).get("fields", [])
         return {f.get("name"): f.get("id") for f in fields if "name" in f and "id" in f}
     except Exception as e:
         print(f"Warning: could not fetch custom fields: {e}")
@@ -74,122 +209,426 @@ def get_instance_fields(username, folder_id, release_id, instance_id, progress=N
         return []
     url = f"{BASE_URL}/users/{username}/collection/folders/{folder_id}/releases/{release_id}/instances/{instance_id}"
     try:
-        data = safe_request(url, progress=progress)
+        data = safe_request(url, progress=progress, expire=INSTANCE_FIELDS_TTL)
         # ✅ Discogs stores custom field values in "notes", not "fields"
         return data.get("notes", []) or []
     except Exception as e:
         print(f"Warning: failed to fetch instance fields for {release_id}/{instance_id}: {e}")
         return []
 
+# -----------------------
+# Local cache
+# -----------------------
+def save_cache(cols, replace=False):
+    """Append fetched columns as a parquet fragment under CACHE_DIR.
+
+    The cache is a parquet dataset partitioned by the year records were
+    added: incremental runs write only their new rows as a fragment and the
+    dataset reader merges fragments on load, so nothing gets rewritten.
+    A full dump passes replace=True to start the dataset over.
+    """
+    if replace and os.path.isdir(CACHE_DIR):
+        shutil.rmtree(CACHE_DIR)
+
+    added_year = (
+        pd.to_datetime(pd.Series(cols["added"]), errors="coerce", utc=True,
+                       format="ISO8601", cache=True)
+        .dt.year.fillna(0).astype("int32")
+    )
+    table = pa.Table.from_pydict(cols).append_column("added_year", pa.array(added_year))
+    pq.write_to_dataset(
+        table, root_path=CACHE_DIR, partition_cols=["added_year"],
+        compression="lz4", use_dictionary=True,
+    )
+
+
+def load_cache():
+    """Load the cached collection as a DataFrame, or None when no cache exists."""
+    if not os.path.isdir(CACHE_DIR):
+        return None
+    df = pq.read_table(CACHE_DIR, memory_map=True).to_pandas(use_threads=True)
+    return df.drop(columns=["added_year"], errors="ignore")
+
+# -----------------------
+# Async fetching (HTTP/2)
+# -----------------------
+def _http2_client(max_connections):
+    """One HTTP/2 client per fan-out: many requests multiplex over a handful
+    of TLS connections instead of one connection per in-flight request."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_connections),
+    )
+
+
+async def _signed_get(client, url, progress=None):
+    """Signed GET with the same retry policy as safe_request.
+
+    429s honor Retry-After when present; 5xx and transport errors back off
+    exponentially with jitter and give up after MAX_RETRIES, so one flaky
+    response no longer aborts a whole asyncio.gather fan-out.
+    """
+    attempt = 0
+    while True:
+        signed_url, signed_headers, _ = oauth_signer.sign(url, http_method="GET")
+        signed_headers["User-Agent"] = USER_AGENT
+
+        try:
+            resp = await client.get(signed_url, headers=signed_headers)
+        except httpx.TransportError as e:
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"⚠️ {type(e).__name__} on {url}; retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                resp.raise_for_status()
+            if resp.status_code == 429 and "Retry-After" in resp.headers:
+                delay = int(resp.headers["Retry-After"])
+            else:
+                delay = _backoff_delay(attempt)
+            msg = f"⚠️ HTTP {resp.status_code} from Discogs; retry {attempt}/{MAX_RETRIES} in {delay:.1f}s"
+            print(msg)
+            if progress:
+                progress.text(msg)
+            await asyncio.sleep(delay)
+            continue
+
+        resp.raise_for_status()
+        return resp
+
+
+async def _fetch_page(client, sem, username, folder_id, page, per_page, progress=None):
+    """Fetch one collection page, honoring Discogs rate limits."""
+    url = f"{BASE_URL}/users/{username}/collection/folders/{folder_id}/releases"
+    params = {"page": page, "per_page": per_page}
+    full_url = f"{url}?{urlencode(params)}"
+
+    # Folder listings are never cached: record positions shift across page
+    # boundaries as the collection changes, so stale pages would silently
+    # drop or duplicate items (same policy as use_cache=False in safe_request).
+    async with sem:
+        resp = await _signed_get(client, full_url, progress=progress)
+        data = orjson.loads(resp.content)
+
+        # Slow down only when the API says we are close to the budget.
+        remaining = resp.headers.get("X-Discogs-Ratelimit-Remaining")
+        if remaining is not None and int(remaining) < RATE_LIMIT_THRESHOLD:
+            await asyncio.sleep(2)
+
+        return data
+
+
+async def _fetch_pages(username, folder_id, pages, per_page, progress=None):
+    sem = asyncio.Semaphore(PAGE_CONCURRENCY)
+    async with _http2_client(PAGE_CONCURRENCY) as client:
+        return await asyncio.gather(*(
+            _fetch_page(client, sem, username, folder_id, page, per_page, progress=progress)
+            for page in pages
+        ))
+
+
+async def _fetch_instance(client, sem, username, folder_id, release_id, instance_id):
+    """Fetch one instance's custom-field notes."""
+    url = f"{BASE_URL}/users/{username}/collection/folders/{folder_id}/releases/{release_id}/instances/{instance_id}"
+    key = _cache_key(url)
+    if key in JSON_CACHE:
+        data = JSON_CACHE[key]
+        return release_id, instance_id, data.get("notes") or []
+
+    async with sem:
+        resp = await _signed_get(client, url)
+        data = orjson.loads(resp.content)
+        JSON_CACHE.set(key, data, expire=INSTANCE_FIELDS_TTL)
+        return release_id, instance_id, data.get("notes") or []
+
+
+async def _fetch_instances(username, folder_id, pairs):
+    sem = asyncio.Semaphore(INSTANCE_CONCURRENCY)
+    async with _http2_client(INSTANCE_CONCURRENCY) as client:
+        return await asyncio.gather(
+            *(_fetch_instance(client, sem, username, folder_id, rid, iid) for rid, iid in pairs),
+            return_exceptions=True,
+        )
+
+
+async def _fetch_release(client, sem, release_id):
+    """Fetch one /releases/{id} payload, honoring 429s like safe_request."""
+    url = f"{BASE_URL}/releases/{release_id}"
+    key = _cache_key(url)
+    if key in JSON_CACHE:
+        return release_id, JSON_CACHE[key]
+
+    async with sem:
+        resp = await _signed_get(client, url)
+        data = orjson.loads(resp.content)
+        JSON_CACHE[key] = data
+        return release_id, data
+
+
+async def _fetch_releases(release_ids):
+    # HTTP/2 multiplexes all release GETs over a handful of TLS connections
+    sem = asyncio.Semaphore(RELEASE_CONCURRENCY)
+    limits = httpx.Limits(max_connections=RELEASE_CONCURRENCY)
+    async with httpx.AsyncClient(http2=True, limits=limits) as client:
+        return await asyncio.gather(*(_fetch_release(client, sem, rid) for rid in release_ids))
+
+
+def fetch_release_durations(release_ids):
+    """Fetch release details for many ids concurrently over HTTP/2 and return
+    {release_id: [track duration strings]}."""
+    results = asyncio.run(_fetch_releases(list(release_ids)))
+    return {
+        rid: [t.get("duration") for t in data.get("tracklist", []) if t.get("duration")]
+        for rid, data in results
+    }
+
 # -----------------------
 # Main fetcher
 # -----------------------
+# keyword detection for the pressing flags, compiled once at import
+_REISSUE_RE = re.compile(r"repress|reissue", re.IGNORECASE)
+_LIMITED_RE = re.compile(r"limited edition", re.IGNORECASE)
+
+COLUMNS = (
+    "release_id", "instance_id", "title", "year", "artists", "labels", "formats",
+    "format_descriptions", "genres", "styles", "added", "rating",
+    "cover_url", "thumb_url", "is_limited", "is_reissue", "is_original",
+    "PricePaid", "Seller", "BandCountry", "TrueStyles",
+)
+
+
+def _resolve_field_ids(username, progress=None):
+    """Map the custom-field names to their Discogs ids, with known fallbacks."""
+    field_name_to_id = get_custom_fields_map(username, _progress=progress)
+    return (
+        field_name_to_id.get("PricePaid") or 4,
+        field_name_to_id.get("Seller") or 5,
+        field_name_to_id.get("BandCountry") or 6,
+        field_name_to_id.get("ActualGenre") or 7,
+    )
+
+
+def _fetch_instance_field_dicts(username, folder_id, items, progress=None):
+    """Fetch custom-field dicts for every item with concurrent HTTP/2 calls,
+    overlapping network latency instead of sleeping between serial requests."""
+    pairs = {
+        (item.get("basic_information", {}).get("id"), item.get("instance_id"))
+        for item in items
+        if item.get("instance_id")
+    }
+
+    instance_cache = {}
+    if pairs:
+        for result in asyncio.run(_fetch_instances(username, folder_id, pairs)):
+            if isinstance(result, Exception):
+                print(f"Warning: failed to fetch instance fields: {result}")
+                continue
+            rid, iid, field_values = result
+            # Discogs guarantees both keys on every note entry, so direct
+            # subscripts beat three .get dispatches per field; tuple keys
+            # hash cheaper than formatted strings
+            instance_cache[(rid, iid)] = {fv["field_id"]: fv["value"] for fv in field_values}
+    return instance_cache
+
+
+# Expression per column, evaluated with `item`, `bi`, `formats`, `fmt_desc`,
+# `field_dict` and the resolved field ids in scope. The per-item appender is
+# generated from this table at import time so the hot loop runs straight-line
+# code with pre-bound list.append methods instead of per-field dict dispatch.
+# `b_get`/`i_get` are bi.get/item.get bound once per item, and name lists
+# subscript directly — the schema guarantees the keys (see the field dicts).
+_COLUMN_EXPRS = {
+    "release_id": 'b_get("id")',
+    "instance_id": "instance_id",
+    "title": 'b_get("title")',
+    "year": 'b_get("year")',
+    "artists": '[a["name"] for a in b_get("artists") or ()]',
+    "labels": '[l["name"] for l in b_get("labels") or ()]',
+    "formats": '[f["name"] for f in formats]',
+    "format_descriptions": '", ".join(fmt_desc) if fmt_desc else None',
+    "genres": 'b_get("genres")',
+    "styles": 'b_get("styles")',
+    "added": 'i_get("date_added")',
+    "rating": 'i_get("rating")',
+    "cover_url": 'b_get("cover_image")',
+    "thumb_url": 'b_get("thumb")',
+    "PricePaid": "f_get(price_id)",
+    "Seller": "f_get(seller_id)",
+    "BandCountry": "f_get(bandcountry_id)",
+    "TrueStyles": "f_get(truestyles_id)",
+}
+
+
+def _build_append_items():
+    src = ["def _append_items(items, cols, instance_cache, field_ids):"]
+    src.append("    price_id, seller_id, bandcountry_id, truestyles_id = field_ids")
+    src.append("    _empty = {}")
+    for col in _COLUMN_EXPRS:
+        src.append(f'    _ap_{col} = cols["{col}"].append')
+    src.append("    for item in items:")
+    src.append("        i_get = item.get")
+    src.append('        bi = i_get("basic_information") or _empty')
+    src.append("        b_get = bi.get")
+    src.append('        formats = b_get("formats") or ()')
+    src.append("        fmt_desc = []")
+    src.append("        for f in formats:")
+    src.append('            if "descriptions" in f:')
+    src.append('                fmt_desc.extend(f["descriptions"])')
+    src.append('        instance_id = i_get("instance_id")')
+    src.append('        field_dict = instance_cache.get((b_get("id"), instance_id), _empty) if instance_id else _empty')
+    src.append("        f_get = field_dict.get")
+    for col, expr in _COLUMN_EXPRS.items():
+        src.append(f"        _ap_{col}({expr})")
+    namespace = {}
+    exec(compile("\n".join(src), "<generated _append_items>", "exec"), namespace)
+    return namespace["_append_items"]
+
+
+_append_items = _build_append_items()
+
+
+def _flatten_items(items, instance_cache, field_ids, progress=None, total_records=0):
+    """Flatten raw collection items into the columnar record layout.
+
+    One append-only list per column; building the DataFrame column-wise
+    avoids pandas' row-by-row dtype inference over per-record dicts.
+    """
+    cols = {name: [] for name in COLUMNS}
+
+    # append in chunks so the progress bar still moves during long dumps;
+    # throttle the widget itself — every update is a WebSocket round-trip
+    chunk = 100
+    last_update = 0.0
+    for start in range(0, len(items), chunk):
+        _append_items(items[start:start + chunk], cols, instance_cache, field_ids)
+        done = min(start + chunk, len(items))
+        now = time.monotonic()
+        if progress and total_records and (now - last_update > 0.25 or done == len(items)):
+            progress.progress(done / total_records, text=f"Fetching releases ({done} / {total_records})")
+            last_update = now
+
+    # join the raw name lists once per column instead of per record in the loop
+    for col in ("artists", "labels", "formats", "genres", "styles"):
+        cols[col] = pd.Series(cols[col], dtype="object").map(lambda xs: ", ".join(xs) if xs else None)
+
+    # derive the pressing flags vectorized over the whole column; the
+    # precompiled case-insensitive patterns make the .lower() pre-pass
+    # (one extra string allocation per record) unnecessary
+    fmt_series = pd.Series(cols["format_descriptions"], dtype="string[pyarrow]")
+    cols["is_reissue"] = fmt_series.str.contains(_REISSUE_RE, na=False).astype(bool)
+    cols["is_limited"] = fmt_series.str.contains(_LIMITED_RE, na=False).astype(bool)
+    cols["is_original"] = ~cols["is_reissue"]
+
+    return cols
+
+
+# Free-text columns stored as Arrow UTF-8 buffers instead of per-cell
+# PyObjects: a fraction of the memory, and .str ops hit Arrow kernels.
+STRING_COLS = (
+    "title", "artists", "format_descriptions",
+    "cover_url", "thumb_url", "TrueStyles",
+)
+
+# Repetitive columns where each value appears many times across the
+# collection: category stores one string per distinct value.
+CATEGORY_COLS = ("labels", "formats", "genres", "styles", "Seller", "BandCountry")
+
+
+def _coerce_frame(df):
+    """Apply the canonical dtypes so every entry point returns one schema."""
+    dtypes = {col: "string[pyarrow]" for col in STRING_COLS}
+    dtypes.update({col: "category" for col in CATEGORY_COLS})
+    dtypes["year"] = "Int32"
+    df = df.astype(dtypes)
+    # parse dates once at ingest so downstream consumers never re-coerce;
+    # Discogs returns ISO timestamps, so skip per-row format inference
+    df["added"] = pd.to_datetime(df["added"], errors="coerce", utc=True, format="ISO8601", cache=True)
+    return df
+
+
+def _cols_to_frame(cols):
+    return _coerce_frame(pd.DataFrame(cols, copy=False))
+
+
 def fetch_all_releases(username, folder_id=0):
     """
     Fetch collection and return DataFrame with full metadata
     + PricePaid, Seller, BandCountry fields.
     Includes progress bar and automatic rate-limit handling.
     """
-    all_records = []
-    page = 1
     per_page = 250
 
-    # progress bar setup
-    first_page = get_collection_folder_releases(username, folder_id, page=1, per_page=1)
-    total_records = first_page["pagination"]["items"]
-    fetched = 0
+    # page 1 tells us how many pages there are; fan out the rest concurrently
+    first_page = get_collection_folder_releases(username, folder_id, page=1, per_page=per_page, use_cache=False)
+    pagination = first_page.get("pagination", {})
+    total_records = pagination.get("items", 0)
+    total_pages = pagination.get("pages", 1)
     progress = st.progress(0, text=f"Fetching releases (0 / {total_records})")
 
-    # get custom field map
-    field_name_to_id = get_custom_fields_map(username, progress=progress)
-    price_id = field_name_to_id.get("PricePaid") or 4
-    seller_id = field_name_to_id.get("Seller") or 5
-    bandcountry_id = field_name_to_id.get("BandCountry") or 6
-    truestyles_id = field_name_to_id.get("ActualGenre") or 7
+    page_payloads = [first_page]
+    if total_pages > 1:
+        page_payloads += asyncio.run(
+            _fetch_pages(username, folder_id, range(2, total_pages + 1), per_page, progress=progress)
+        )
 
-    instance_cache = {}
+    field_ids = _resolve_field_ids(username, progress=progress)
+    items = [item for data in page_payloads for item in data.get("releases", [])]
+    instance_cache = _fetch_instance_field_dicts(username, folder_id, items, progress=progress)
+    cols = _flatten_items(items, instance_cache, field_ids, progress=progress, total_records=total_records)
+    progress.empty()
+
+    save_cache(cols, replace=True)
+    return _cols_to_frame(cols)
 
+
+def incremental_update(username, folder_id=0):
+    """Fetch only releases not yet in the local cache and merge them in.
+
+    New items are flattened on their own and written as an O(new) parquet
+    fragment; the dataset reader merges fragments on load, so the existing
+    cache is never rewritten or concatenated in memory.
+    """
+    df_cache = load_cache()
+    if df_cache is None or len(df_cache) == 0:
+        return fetch_all_releases(username, folder_id)
+
+    # parquet round-trips the raw ingest columns; re-apply the canonical
+    # dtypes so this path returns the same schema as fetch_all_releases
+    df_cache = _coerce_frame(df_cache)
+
+    # frozenset over the raw numpy array: int hashing fast path, and no
+    # per-element Series boxing like set(df_cache["instance_id"]) would do
+    known_instances = frozenset(df_cache["instance_id"].dropna().to_numpy())
+
+    # walk newest additions first so we can stop at the first known item;
+    # the sort params make that ordering explicit instead of assumed
+    new_items = []
+    page = 1
     while True:
-        data = get_collection_folder_releases(username, folder_id, page=page, per_page=per_page, progress=progress)
+        data = get_collection_folder_releases(username, folder_id, page=page,
+                                              sort="added", sort_order="desc", use_cache=False)
         releases = data.get("releases", [])
-        if not releases:
-            break
-
-        for item in releases:
-            bi = item.get("basic_information", {})
-            formats = bi.get("formats", [])
-            fmt_desc = []
-            for f in formats:
-                if "descriptions" in f:
-                    fmt_desc.extend(f["descriptions"])
-
-            fmt_desc_lower = [d.lower() for d in fmt_desc]
-            is_reissue = any("repress" in d or "reissue" in d for d in fmt_desc_lower)
-            is_limited = any("limited edition" in d for d in fmt_desc_lower)
-            is_original = not is_reissue
-
-            instance_id = item.get("instance_id")
-            release_id = bi.get("id")
-
-            price_paid_val = None
-            seller_val = None
-            bandcountry_val = None
-
-            if instance_id:
-                cache_key = f"{release_id}_{instance_id}"
-                if cache_key in instance_cache:
-                    field_dict = instance_cache[cache_key]
-                else:
-                    field_values = get_instance_fields(username, folder_id, release_id, instance_id, progress=progress)
-                    field_dict = {
-                        fv.get("field_id"): fv.get("value")
-                        for fv in field_values if fv.get("field_id") is not None
-                    }
-                    instance_cache[cache_key] = field_dict
-                    time.sleep(1.5)  # normal pacing to avoid burst
-
-                price_paid_val = field_dict.get(price_id)
-                seller_val = field_dict.get(seller_id)
-                bandcountry_val = field_dict.get(bandcountry_id)
-                truestyles_val = field_dict.get(truestyles_id)
-
-            rec = {
-                "release_id": bi.get("id"),
-                "title": bi.get("title"),
-                "year": bi.get("year"),
-                "artists": ", ".join([a.get("name") for a in bi.get("artists", [])]) if bi.get("artists") else None,
-                "labels": ", ".join([l.get("name") for l in bi.get("labels", [])]) if bi.get("labels") else None,
-                "formats": ", ".join([f.get("name") for f in formats]) if formats else None,
-                "format_descriptions": ", ".join(fmt_desc) if fmt_desc else None,
-                "genres": ", ".join(bi.get("genres", [])) if bi.get("genres") else None,
-                "styles": ", ".join(bi.get("styles", [])) if bi.get("styles") else None,
-                "added": item.get("date_added"),
-                "rating": item.get("rating"),
-                "cover_url": bi.get("cover_image"),
-                "thumb_url": bi.get("thumb"),
-                "is_limited": is_limited,
-                "is_reissue": is_reissue,
-                "is_original": is_original,
-                "PricePaid": price_paid_val,
-                "Seller": seller_val,
-                "BandCountry": bandcountry_val,
-                "TrueStyles": truestyles_val
-            }
-
-            all_records.append(rec)
-
-            # update progress bar
-            fetched += 1
-            progress.progress(fetched / total_records, text=f"Fetching releases ({fetched} / {total_records})")
-
-        pagination = data.get("pagination", {})
-        if page >= pagination.get("pages", 0):
+        unknown = [item for item in releases if item.get("instance_id") not in known_instances]
+        new_items.extend(unknown)
+        if len(unknown) < len(releases) or page >= data.get("pagination", {}).get("pages", 0):
             break
         page += 1
-        time.sleep(1)  # gentle pause between pages
 
-    progress.empty()
-    return pd.DataFrame(all_records)
+    if not new_items:
+        return df_cache
+
+    field_ids = _resolve_field_ids(username)
+    instance_cache = _fetch_instance_field_dicts(username, folder_id, new_items)
+    cols = _flatten_items(new_items, instance_cache, field_ids)
+    save_cache(cols)
+    return _coerce_frame(load_cache())
 
 
 
@@ -2,13 +2,32 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import random
+import plotly.graph_objects as go
+import plotly.io as pio
+import pyarrow as pa
+import pyarrow.compute as pc
+import textwrap
+import numpy as np
 from collection_dump import fetch_all_releases
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; bulk summing falls back to pure Python
+    njit = None
 import requests
-import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from streamlit_plotly_events import plotly_events
 
 
+# serialize every figure with orjson instead of stdlib json
+pio.json.config.default_engine = "orjson"
+
+_RNG = np.random.default_rng()
+
+# strips Discogs' "(123)" name-disambiguation suffix
+_DISAMB_PATTERN = r"\s*\(\d+\)$"
+
 USER_TOKEN = st.secrets["DISCOGS_TOKEN"]
 USERNAME = st.secrets["DISCOGS_USERNAME"]
 
@@ -20,81 +39,235 @@ headers = {
     "Authorization": f"Discogs token={USER_TOKEN}"
 }
 
+# Pooled session so repeated API calls reuse the same TLS connection;
+# transient failures retry at the adapter level with backoff
+SESSION = requests.Session()
+SESSION.headers.update(headers)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504]),
+))
+
 st.set_page_config(page_title="Discogs Collection Dashboard", layout="wide")
 st.title("📀 Niolu's Vinyls Collection Dashboard")
 
 # --------------------------
 # Cached fetch
 # --------------------------
-@st.cache_data(show_spinner="Fetching data from Discogs API...")
+@st.cache_resource(ttl=3600, show_spinner="Fetching data from Discogs API...")
 def load_collection(username):
+    """One shared read-only frame per session cache.
+
+    cache_resource hands every caller the same object instead of
+    cache_data's pickle round-trip and per-call copy; nothing downstream
+    mutates it (preprocess copies before coercing).
+    """
     return fetch_all_releases(username)
 
+
+@st.cache_data(show_spinner=False)
+def preprocess(username):
+    """Coerce dtypes and pre-split multi-value columns once.
+
+    Streamlit reruns the whole script on every interaction; caching this
+    keeps the full-column parses and splits out of the rerun path. Keyed
+    on username so cache lookups hash a short string, not the frame.
+    """
+    # shallow copy: columns below are rebound, never mutated in place, so
+    # the shared cache_resource frame stays untouched
+    df = load_collection(username).copy(deep=False)
+    # year (Int32) and added (UTC datetime) are already typed at ingest
+    df["PricePaid"] = pd.to_numeric(df["PricePaid"], errors="coerce").astype("float32")
+    df["genres_list"] = df["genres"].astype("string").str.split(", ")
+    df["styles_list"] = df["styles"].astype("string").str.split(", ")
+    # uppercase the category dictionary once; every rerun then reuses the
+    # cleaned codes instead of re-uppercasing the whole column
+    df["BandCountry"] = df["BandCountry"].astype("string").str.upper().astype("category")
+    # month bucket shared by every monthly aggregation below
+    df["added_month"] = df["added"].dt.to_period("M").dt.to_timestamp()
+    return df
+
+
 # Load once (cached)
-df = load_collection(USERNAME).copy()
-
-# Parse dates safely
-df["added"] = pd.to_datetime(
-    df["added"],
-    errors="coerce",
-    utc=True,
-    infer_datetime_format=True
-)
+df = preprocess(USERNAME)
 
 # --------------------------
 # Sidebar filters
 # --------------------------
 df_filtered = df
 
-def parse_duration(duration_str):
-    """Convert Discogs duration string (MM:SS or HH:MM:SS) into seconds."""
-    if not isinstance(duration_str, str) or not duration_str.strip():
-        return 0
-    parts = duration_str.split(":")
-    try:
-        parts = [int(p) for p in parts]
-        if len(parts) == 2:  # MM:SS
-            return parts[0] * 60 + parts[1]
-        elif len(parts) == 3:  # HH:MM:SS
-            return parts[0] * 3600 + parts[1] * 60 + parts[2]
-        else:
-            return 0
-    except Exception:
-        return 0
+def durations_to_seconds(durations):
+    """Convert Discogs duration strings (MM:SS or HH:MM:SS) to seconds.
+
+    One regex-extract pass over the whole column plus integer arithmetic;
+    unparseable entries count as 0.
+    """
+    s = pd.Series(durations, dtype="string")
+    m = (
+        s.str.extract(r"^\s*(?:(\d+):)?(\d+):(\d+)\s*$")
+        .astype("Int64")
+        .fillna(0)
+    )
+    return m[0] * 3600 + m[1] * 60 + m[2]
+
+if njit is not None:
+    @njit(cache=True)
+    def _sum_durations_kernel(buf, lo, hi):
+        total = 0
+        for i in range(lo.shape[0]):
+            seconds = 0
+            cur = 0
+            bad = False
+            for j in range(lo[i], hi[i]):
+                b = buf[j]
+                if 48 <= b <= 57:  # '0'-'9'
+                    cur = cur * 10 + (b - 48)
+                elif b == 58:  # ':'
+                    seconds = (seconds + cur) * 60
+                    cur = 0
+                else:
+                    bad = True
+                    break
+            if not bad:
+                total += seconds + cur
+        return total
+
+    @njit(cache=True)
+    def _token_bounds_kernel(buf, lo, hi, rows, starts, ends):
+        """Locate comma/newline-delimited tokens, trimming surrounding blanks.
+
+        Fills (row, start, end) triples into the preallocated arrays and
+        returns how many tokens were found — offsets only, so no string
+        objects are created inside the compiled loop.
+        """
+        k = 0
+        for i in range(lo.shape[0]):
+            s = lo[i]
+            for j in range(lo[i], hi[i] + 1):
+                if j == hi[i] or buf[j] == 44 or buf[j] == 10 or buf[j] == 13:  # ',' '\n' '\r'
+                    a, b = s, j
+                    while a < b and (buf[a] == 32 or buf[a] == 9):  # ' ' '\t'
+                        a += 1
+                    while b > a and (buf[b - 1] == 32 or buf[b - 1] == 9):
+                        b -= 1
+                    if b > a:
+                        rows[k] = i
+                        starts[k] = a
+                        ends[k] = b
+                        k += 1
+                    s = j + 1
+        return k
+
+
+def _pack_strings(strings):
+    """Flatten strings into one byte buffer plus per-string offsets."""
+    encoded = [s.encode() if isinstance(s, str) else b"" for s in strings]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    hi = np.cumsum(lengths)
+    lo = hi - lengths
+    buf = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return buf, lo, hi
+
+
+def sum_durations(durations):
+    """Total seconds across many Discogs duration strings.
+
+    With numba installed this runs as a single compiled pass over a packed
+    byte buffer; otherwise it sums the vectorized per-string seconds.
+    """
+    durations = list(durations)
+    if njit is not None and durations:
+        return int(_sum_durations_kernel(*_pack_strings(durations)))
+    return int(durations_to_seconds(durations).sum()) if durations else 0
+
+def lttb_downsample(values, n_out=1000):
+    """Pick ~n_out representative positions via largest-triangle-three-buckets.
+
+    Keeps the visual shape of a long series while capping how many points
+    Plotly ships to the browser; series at or under n_out pass through
+    untouched. Returns integer positions into `values`.
+    """
+    n = len(values)
+    if n <= n_out:
+        return np.arange(n)
+
+    y = np.asarray(values, dtype=float)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    out = np.empty(n_out, dtype=int)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if hi <= lo:  # degenerate bucket when n is barely above n_out
+            a = lo
+            out[i + 1] = a
+            continue
+        nhi = max(edges[i + 2] if i + 2 < len(edges) else n, hi + 1)
+        avg_x = x[hi:nhi].mean()
+        avg_y = y[hi:nhi].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
 
 # --------------------------
 # Quick Synthesis / Stats
 # --------------------------
+@st.cache_data(show_spinner=False)
+def headline_stats(username):
+    """Scalar aggregates for the top metric cards, computed in one go.
+
+    Caching them means reruns skip the column scans entirely instead of
+    re-summing and re-scanning per card.
+    """
+    d = preprocess(username)
+    years = d["year"][d["year"] > 0]
+    return {
+        "total_records": len(d),
+        "total_spent": float(d["PricePaid"].sum()),
+        "year_min": int(years.min()) if not years.empty else None,
+        "year_max": int(years.max()) if not years.empty else None,
+    }
+
+
+stats = headline_stats(USERNAME)
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.metric("🎵 Total Records", f"{len(df_filtered):,}")
+    st.metric("🎵 Total Records", f"{stats['total_records']:,}")
 
 with col2:
-    total_spent = pd.to_numeric(df_filtered["PricePaid"], errors="coerce").sum()
-    st.metric("💰 Total Spent (CHF)", f"{total_spent:,.2f}")
+    st.metric("💰 Total Spent (CHF)", f"{stats['total_spent']:,.2f}")
 
 
 with col3:
-    years = pd.to_numeric(df_filtered["year"], errors="coerce")
-    years = years[years > 0]
-    if not years.empty:
-        st.metric("📅 Year Range", f"{int(years.min())} - {int(years.max())}")
+    if stats["year_min"] is not None:
+        st.metric("📅 Year Range", f"{stats['year_min']} - {stats['year_max']}")
     else:
         st.metric("📅 Year Range", "N/A")
 
 with col4:
     if "labels" in df_filtered.columns and not df_filtered["labels"].dropna().empty:
-        all_labels = (
-            df_filtered["labels"]
-            .dropna()
-            .str.split(", ")
-            .explode()
-            .str.replace(r"\s*\(\d+\)$", "", regex=True)
-            .str.strip()
+        # split + strip the "(123)" disambiguation via Arrow's RE2 kernels:
+        # one vectorized C++ pass, no regex recompile per rerun
+        labels_arr = pa.array(df_filtered["labels"].dropna().astype("string[pyarrow]"))
+        cleaned = pc.utf8_trim_whitespace(
+            pc.replace_substring_regex(
+                pc.list_flatten(pc.split_pattern(labels_arr, ", ")),
+                _DISAMB_PATTERN, "",
+            )
         )
-        top_label = all_labels.value_counts().idxmax()
-        top_count = all_labels.value_counts().max()
+        all_labels = pd.Series(pd.arrays.ArrowStringArray(cleaned))
+        label_counts = all_labels.value_counts()  # sorted descending
+        top_label = label_counts.index[0]
+        top_count = int(label_counts.iloc[0])
         st.metric("🏆 Favourite Label", f"{top_label} ({top_count})")
     else:
         st.metric("🏆 Favourite Label", "N/A")
@@ -103,28 +276,41 @@ with col4:
 # Records by Year
 # --------------------------
 st.subheader("📅 Records by Year")
-df_filtered["year"] = pd.to_numeric(df_filtered["year"], errors="coerce")
-df_year = df_filtered[df_filtered["year"] > 0]
 
-df_year = df_year["year"].value_counts().sort_index().reset_index()
-df_year.columns = ["Year", "Count"]
+# Chart builders are cached on username (the loaded collection itself is
+# already cached on the same key), so reruns reuse the serialized traces
+# instead of re-aggregating and rebuilding the figure.
+@st.cache_data(show_spinner=False)
+def year_chart(username):
+    d = preprocess(username)
+    # filter the one column as a numpy array; d[d["year"] > 0] would copy
+    # every column just to count one
+    years = d["year"].to_numpy(dtype="float64", na_value=np.nan)
+    years = years[years > 0].astype("int64")
+    if years.size == 0:
+        return None
+    d_year = pd.Series(years).value_counts().sort_index().rename_axis("Year").reset_index(name="Count")
 
-if df_year.empty:
-    st.warning("No valid release years found in your collection.")
-else:
-    max_year = df_year.loc[df_year["Count"].idxmax(), "Year"]
-    df_year["Category"] = df_year["Year"].apply(lambda y: "Max" if y == max_year else "Other")
+    max_year = d_year.loc[d_year["Count"].idxmax(), "Year"]
+    d_year["Category"] = np.where(d_year["Year"].eq(max_year), "Max", "Other")
 
-    fig_year = px.bar(
-        df_year,
+    fig = px.bar(
+        d_year,
         x="Year",
         y="Count",
         color="Category",
         title="Records by Year",
         color_discrete_map={"Max": "#e74c3c", "Other": "#3498db"}
     )
-    fig_year.update_layout(showlegend=False)
-    st.plotly_chart(fig_year, use_container_width=True)
+    fig.update_layout(showlegend=False)
+    return fig.to_dict()
+
+
+fig_year_dict = year_chart(USERNAME)
+if fig_year_dict is None:
+    st.warning("No valid release years found in your collection.")
+else:
+    st.plotly_chart(go.Figure(fig_year_dict), use_container_width=True, key="year_chart")
 
 ## --------------------------
 # Top TrueStyles
@@ -132,113 +318,163 @@ else:
 
 st.subheader("🎼 Top TrueStyles")
 
-def clean_truestyles(row):
-    """Split TrueStyles field into a list, handling multiple line breaks and commas."""
-    if pd.isna(row):
+def split_truestyles(series):
+    """Explode a TrueStyles column into one trimmed style per row.
+
+    Line breaks and commas both separate styles. With numba installed the
+    token boundaries come from one compiled pass over a packed byte buffer
+    (no intermediate list column to explode); otherwise the split runs as
+    vectorized str ops.
+    """
+    dropped = series.dropna()
+    if njit is not None and len(dropped):
+        buf, lo, hi = _pack_strings(dropped.tolist())
+        # every separator byte plus one trailing token per string bounds k
+        max_tokens = int(((buf == 44) | (buf == 10) | (buf == 13)).sum()) + len(dropped)
+        rows = np.empty(max_tokens, dtype=np.int64)
+        starts = np.empty(max_tokens, dtype=np.int64)
+        ends = np.empty(max_tokens, dtype=np.int64)
+        k = _token_bounds_kernel(buf, lo, hi, rows, starts, ends)
+        tokens = [buf[starts[t]:ends[t]].tobytes().decode() for t in range(k)]
+        return pd.Series(tokens, index=dropped.index.to_numpy()[rows[:k]], dtype="string")
+
+    styles = (
+        dropped
+        .astype("string")
+        .str.replace(r"[\r\n]+", ",", regex=True)
+        .str.split(",")
+        .explode()
+        .str.strip()
+    )
+    return styles[styles.ne("")]
+
+@st.cache_data(show_spinner=False)
+def style_index(username):
+    """Exploded TrueStyles (row label -> style) plus global counts.
+
+    Cached so the tokenize runs once per collection instead of on every
+    widget-triggered rerun; keyed on username like the other cached
+    builders, since the loaded collection shares that key.
+    """
+    d = preprocess(username)
+    styles = split_truestyles(d["TrueStyles"])
+    return styles, styles.value_counts()
+
+@st.cache_data(show_spinner=False)
+def style_row_index(username):
+    """Inverted index: style -> array of row labels carrying that style."""
+    styles, _ = style_index(username)
+    frame = pd.DataFrame({"row": styles.index.to_numpy(), "Style": styles.to_numpy()})
+    return {style: rows.unique() for style, rows in frame.groupby("Style")["row"]}
+
+@st.cache_data(show_spinner=False)
+def styles_chart(username, top_n=None):
+    _, counts = style_index(username)
+    d_styles = counts.reset_index()
+    d_styles.columns = ["Style", "Count"]
+
+    # ✅ Keep only styles with at least 2 records
+    d_styles = d_styles[d_styles["Count"] >= 2]
+    if d_styles.empty:
         return None
-    # Split into lines, then split each line by commas
-    parts = str(row).splitlines()
-    styles = []
-    for p in parts:
-        styles.extend([s.strip() for s in p.split(",") if s.strip()])
-    return styles if styles else None
-
-df_styles = (
-    df_filtered["TrueStyles"]
-    .dropna()
-    .apply(clean_truestyles)
-    .dropna()
-    .explode()   # expands multiple styles per record
-    .value_counts()
-    .reset_index()
-)
-df_styles.columns = ["Style", "Count"]
 
-# ✅ Keep only styles with at least 2 records
-df_styles = df_styles[df_styles["Count"] >= 2]
+    if top_n:  # counts are already sorted descending
+        d_styles = d_styles.head(top_n)
+    d_styles = d_styles.sort_values("Count", ascending=True)
+    max_style = d_styles["Style"].iat[-1]  # last row is the max after the sort
 
-if df_styles.empty:
-    st.warning("No valid TrueStyles (min 2 records) found in your collection.")
-else:
-    df_styles = df_styles.sort_values("Count", ascending=True)
-    max_style = df_styles.loc[df_styles["Count"].idxmax(), "Style"]
-    df_styles["Category"] = df_styles["Style"].apply(lambda s: "Max" if s == max_style else "Other")
-
-    import plotly.express as px
-    fig_styles = px.bar(
-        df_styles,
-        x="Count",
-        y="Style",
+    # go.Bar with a vectorized color array: one trace, no per-category
+    # split, and the DOM stays bounded by the top_n cap
+    fig = go.Figure(go.Bar(
+        x=d_styles["Count"],
+        y=d_styles["Style"],
         orientation="h",
-        color="Category",
+        marker_color=np.where(d_styles["Style"].eq(max_style), "#e74c3c", "#3498db").tolist(),
+    ))
+    fig.update_layout(
         title="Top TrueStyles (min 2 records)",
-        color_discrete_map={"Max": "#e74c3c", "Other": "#3498db"}
+        showlegend=False,
+        height=19 * len(d_styles)
     )
-    fig_styles.update_layout(
-    showlegend=False,
-    height=19 * len(df_styles)   # 30px per bar row
-    )
-    st.plotly_chart(fig_styles, use_container_width=True)
+    return fig.to_dict()
 
 
+# Fragment: toggling the checkbox redraws only this chart, and the stable
+# key lets the front end diff the figure instead of rebuilding it
+@st.fragment
+def render_styles_section():
+    show_all_styles = st.checkbox("Show all styles", value=False)
+    fig_styles_dict = styles_chart(USERNAME, top_n=None if show_all_styles else 50)
+    if fig_styles_dict is None:
+        st.warning("No valid TrueStyles (min 2 records) found in your collection.")
+    else:
+        st.plotly_chart(go.Figure(fig_styles_dict), use_container_width=True, key="styles_chart")
 
-# --- TrueStyle Evolution ---
-st.subheader("🎨 Cumulative Purchases over time by TrueStyle")
 
-# Make sure 'added' is datetime
-df["added"] = pd.to_datetime(df["added"], errors="coerce")
+render_styles_section()
 
-# Collect all TrueStyles with line-break aware splitting
-all_styles = []
-for s in df["TrueStyles"].dropna():
-    parts = str(s).splitlines()
-    for p in parts:
-        all_styles.extend([x.strip() for x in p.split(",") if x.strip()])
 
-# Count occurrences
-style_counts = pd.Series(all_styles).value_counts()
 
-# Keep only styles with at least 5 items
-filtered_styles = sorted(style_counts[style_counts >= 5].index.tolist())
+# --- TrueStyle Evolution ---
+st.subheader("🎨 Cumulative Purchases over time by TrueStyle")
 
-# TrueStyle selector
-selected_style = st.selectbox("Select a TrueStyle", filtered_styles)
+@st.cache_data(show_spinner=False)
+def style_options(username, min_count=5):
+    """Sorted selector options for styles with at least min_count records."""
+    _, counts = style_index(username)
+    return sorted(counts[counts >= min_count].index.tolist())
 
-if selected_style:
-    # Filter rows that contain the selected style
-    mask = df["TrueStyles"].fillna("").str.contains(selected_style, case=False, na=False)
-    df_style = df[mask].copy()
+
+# Fragment: changing the selector reruns only this section instead of the
+# whole script (all other charts kept their state)
+@st.fragment
+def render_style_evolution():
+    # TrueStyle selector (options cached, not rebuilt per rerun)
+    selected_style = st.selectbox("Select a TrueStyle", style_options(USERNAME))
+    if not selected_style:
+        return
+
+    # O(1) lookup into the cached inverted index: no per-rerun scan over the
+    # column, and exact matches only ("House" never matches "Deep House")
+    rows = style_row_index(USERNAME).get(selected_style, [])
+    df_style = df.loc[rows].copy()
 
     if not df_style.empty:
-        # Group purchases by month
-        df_style["month"] = df_style["added"].dt.to_period("M").dt.to_timestamp()
+        # Group purchases by the precomputed month bucket
         style_counts = (
-            df_style.groupby("month").size().reset_index(name="Purchases")
+            df_style.groupby("added_month").size().reset_index(name="Purchases")
         )
         # Convert to cumulative
         style_counts["Cumulative"] = style_counts["Purchases"].cumsum()
 
         fig = px.line(
             style_counts,
-            x="month",
+            x="added_month",
             y="Cumulative",
             markers=True,
             title=f"Cumulative Purchases Over Time — {selected_style}"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="style_evolution_chart")
     else:
         st.info("No purchases found for this TrueStyle.")
 
 
+render_style_evolution()
+
+
 
 # --------------------------
 # Pressing Types
 # --------------------------
 st.subheader("📀 Original Press VS Reissue/Repress")
 
+# both flag columns summed in one contiguous pass
+orig_count, reissue_count = (
+    df_filtered[["is_original", "is_reissue"]].to_numpy(dtype=np.int32).sum(axis=0)
+)
 pressing_counts = {
-    "Original Press": int(df_filtered["is_original"].sum()),
-    "Repress/Reissue": int(df_filtered["is_reissue"].sum()),
+    "Original Press": int(orig_count),
+    "Repress/Reissue": int(reissue_count),
 }
 total = sum(pressing_counts.values())
 
@@ -250,23 +486,19 @@ icons = {
 ICON_SCALE = 5
 WRAP = 10
 
+# pressing_counts already lists Original Press first, so no re-sort needed
 all_rows = []
 for press_type, count in pressing_counts.items():
     if total > 0 and count > 0:
         percent = (count / total) * 100
-        num_icons = max(1, int(round(percent / ICON_SCALE)))
-        icon_block = "".join([icons[press_type]] * num_icons)
-        all_rows.append((press_type, percent, icon_block))
-
-sorted_rows = sorted(all_rows, key=lambda x: 0 if x[0] == "Original Press" else 1)
-
-icons_string = "".join([row[2] for row in sorted_rows])
-wrapped_rows = [icons_string[i:i+WRAP] for i in range(0, len(icons_string), WRAP)]
+        num_icons = max(1, round(100 * count / (total * ICON_SCALE)))
+        all_rows.append((press_type, percent, num_icons))
 
-icons_html = "<br>".join(wrapped_rows)
+icons_string = "".join(icons[t] * n for t, _, n in all_rows)
+icons_html = "<br>".join(textwrap.wrap(icons_string, WRAP))
 st.markdown(f"<div style='text-align:center; font-size:32px;'>{icons_html}</div>", unsafe_allow_html=True)
 
-legend_html = " ".join([f"{icons[t]} = {t} ({p:.1f}%)" for t, p, _ in sorted_rows])
+legend_html = " ".join(f"{icons[t]} = {t} ({p:.1f}%)" for t, p, _ in all_rows)
 st.markdown(f"<p style='text-align:center; color:gray; font-size:90%;'>{legend_html}</p>", unsafe_allow_html=True)
 
 # --------------------------
@@ -274,21 +506,18 @@ st.markdown(f"<p style='text-align:center; color:gray; font-size:90%;'>{legend_h
 # --------------------------
 st.subheader("💸 Spending & Sellers Insights")
 
-# Ensure numeric PricePaid
-df_filtered["PricePaid"] = pd.to_numeric(df_filtered["PricePaid"], errors="coerce")
-
 # Monthly spending trend
 if not df_filtered["added"].isna().all():
     monthly_spending = (
         df_filtered.dropna(subset=["added", "PricePaid"])
-        .set_index("added")
-        .resample("M")["PricePaid"]
+        .groupby("added_month")["PricePaid"]
         .sum()
     )
     avg_monthly = monthly_spending.mean()
 
     st.metric("📊 Monthly Avg Spending", f"{avg_monthly:.2f} CHF")
 
+    monthly_spending = monthly_spending.iloc[lttb_downsample(monthly_spending.values)]
     fig_spending = px.line(
         monthly_spending,
         x=monthly_spending.index,
@@ -296,13 +525,13 @@ if not df_filtered["added"].isna().all():
         title="Monthly Spending (CHF)",
         labels={"x": "Month", "y": "Total Spent (CHF)"}
     )
-    st.plotly_chart(fig_spending, use_container_width=True)
+    st.plotly_chart(fig_spending, use_container_width=True, key="spending_chart")
 
 # Favourite Seller
 if "Seller" in df_filtered.columns:
-    seller_counts = df_filtered["Seller"].value_counts()
-    fav_seller = seller_counts.idxmax() if not seller_counts.empty else None
-    fav_count = seller_counts.max() if not seller_counts.empty else 0
+    seller_counts = df_filtered["Seller"].value_counts()  # sorted descending
+    fav_seller = seller_counts.index[0] if not seller_counts.empty else None
+    fav_count = int(seller_counts.iloc[0]) if not seller_counts.empty else 0
     st.metric("🏆 Favourite Seller", f"{fav_seller} ({fav_count} records)")
 
 # Seller analysis: cheapest & most expensive (avg price, >3 records)
@@ -329,8 +558,8 @@ if not df_seller_stats.empty:
         st.metric("🔴 Most Expensive Seller", f"{most_exp['Seller']} ({most_exp['avg_price']:.2f} CHF avg)")
 
     # Add color category: red for the most expensive seller, blue for the rest
-    df_seller_stats["Category"] = df_seller_stats["Seller"].apply(
-        lambda s: "Max" if s == most_exp["Seller"] else "Other"
+    df_seller_stats["Category"] = np.where(
+        df_seller_stats["Seller"].eq(most_exp["Seller"]), "Max", "Other"
     )
 
     fig_sellers = px.bar(
@@ -344,38 +573,30 @@ if not df_seller_stats.empty:
         color_discrete_map={"Max": "#e74c3c", "Other": "#3498db"}
     )
     fig_sellers.update_layout(showlegend=False)
-    st.plotly_chart(fig_sellers, use_container_width=True)
+    st.plotly_chart(fig_sellers, use_container_width=True, key="sellers_chart")
 
 #####################
 ### Price Buckets ###
 #####################
 #####################
 
-df_prices = df_filtered.dropna(subset=["PricePaid"])
-bins = [0, 10, 25, 50, 100]
 labels = ["0-10", "10-25", "25-50", "50-100"]
 
-df_prices["price_bucket"] = pd.cut(
-    df_prices["PricePaid"], 
-    bins=bins, 
-    labels=labels, 
-    include_lowest=True, 
-    ordered=True
-)
-
-# preserve order by reindexing explicitly
-bucket_counts = (
-    df_prices["price_bucket"]
-    .value_counts(sort=False)  # don't sort by count
-    .reindex(labels)           # ensure categorical order
-    .reset_index()
-)
-bucket_counts.columns = ["Bucket", "Count"]
-
-if not bucket_counts.empty:
+# one searchsorted pass over the fixed bin ladder instead of pd.cut's
+# generic binning plus Categorical allocation (buckets right-closed,
+# like the previous pd.cut)
+prices = df_filtered["PricePaid"].dropna().to_numpy()
+codes = np.searchsorted([10, 25, 50, 100], prices, side="left")
+codes = codes[(prices >= 0) & (codes < len(labels))]  # drop out-of-ladder prices
+bucket_counts = pd.DataFrame({
+    "Bucket": labels,
+    "Count": np.bincount(codes, minlength=len(labels)),
+})
+
+if bucket_counts["Count"].sum() > 0:
     max_bucket = bucket_counts.loc[bucket_counts["Count"].idxmax(), "Bucket"]
-    bucket_counts["Category"] = bucket_counts["Bucket"].apply(
-        lambda b: "Max" if b == max_bucket else "Other"
+    bucket_counts["Category"] = np.where(
+        bucket_counts["Bucket"].eq(max_bucket), "Max", "Other"
     )
 
     fig = px.bar(
@@ -387,7 +608,7 @@ if not bucket_counts.empty:
         color_discrete_map={"Max": "#e74c3c", "Other": "#3498db"}
     )
     fig.update_layout(showlegend=False, xaxis=dict(categoryorder="array", categoryarray=labels))
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key="price_buckets_chart")
 else:
     st.info("No price data available to build cohorts.")
 
@@ -443,17 +664,19 @@ ISO3_TO_ISO2 = {
     "ZMB": "ZM", "ZWE": "ZW"
 }
 
-def iso3_to_iso2(iso3):
-    return ISO3_TO_ISO2.get(iso3.upper())
-
 st.subheader("🌍 Bands by Country")
 
-if "BandCountry" in df_filtered.columns and not df_filtered["BandCountry"].dropna().empty:
+# Fragment: the table toggle reruns only this section
+@st.fragment
+def render_country_section():
+    if "BandCountry" not in df_filtered.columns or df_filtered["BandCountry"].dropna().empty:
+        st.info("No country data available in BandCountry field.")
+        return
+
     # Count records per country
     country_counts = (
-        df_filtered["BandCountry"]
+        df_filtered["BandCountry"]  # uppercased at load time
         .dropna()
-        .str.upper()
         .value_counts()
         .reset_index()
     )
@@ -462,26 +685,26 @@ if "BandCountry" in df_filtered.columns and not df_filtered["BandCountry"].dropn
     # --- Top 5 countries with flags ---
     st.markdown("### 🏳️ Top 5 Countries")
 
-    top5 = country_counts.head(5)
+    top5 = country_counts.head(5).copy()
+    # one Series.map over the constant dict (codes are already uppercased
+    # above), then plain-tuple iteration — no iterrows Series per row
+    top5["iso2"] = top5["Country"].map(ISO3_TO_ISO2)
     cols = st.columns(len(top5))
 
-    for i, row in top5.iterrows():
-        iso2 = iso3_to_iso2(row["Country"])
-        count = row["Count"]
-
-        with cols[list(top5.index).index(i)]:
-            if iso2:
+    for col, country, count, iso2 in zip(cols, top5["Country"], top5["Count"], top5["iso2"]):
+        with col:
+            if isinstance(iso2, str):
                 flag_url = f"https://flagcdn.com/48x36/{iso2.lower()}.png"
                 st.image(flag_url, width=48)
-            st.metric(row["Country"], f"{count} bands")
+            st.metric(country, f"{count} bands")
 
     # --- Toggle full recap table ---
     if st.checkbox("Show full country table", value=False):
         st.markdown("### 📋 All Countries")
         st.dataframe(country_counts, use_container_width=True)
 
-else:
-    st.info("No country data available in BandCountry field.")
+
+render_country_section()
 
 
 
@@ -491,59 +714,88 @@ else:
 # --------------------------
 st.subheader("📈 Collection Growth Over Time")
 
-missing_added = df_filtered["added"].isna().sum()
-df_time = df_filtered.dropna(subset=["added"]).set_index("added").sort_index()
+@st.cache_data(show_spinner=False)
+def growth_chart(username):
+    d = preprocess(username)
+    added = d["added"].dropna()
+    if added.empty:
+        return None
 
-if df_time.empty:
-    st.warning("No valid 'date_added' found in your collection.")
-else:
-    monthly_adds = df_time.resample("M").size()
+    # integer month histogram: one bincount over year*12+month codes
+    # instead of resample/groupby machinery; gap months count as zero,
+    # matching what a resample would produce
+    key = added.dt.year.to_numpy() * 12 + added.dt.month.to_numpy() - 1
+    lo = int(key.min())
+    counts = np.bincount(key - lo)
+    months = pd.period_range(
+        start=pd.Period(year=lo // 12, month=lo % 12 + 1, freq="M"),
+        periods=len(counts), freq="M",
+    ).to_timestamp()
+    monthly_adds = pd.Series(counts, index=months)
     cumulative = monthly_adds.cumsum()
 
-    # --- Extra stats ---
-    avg_per_month = monthly_adds.mean()
-    most_active_month = monthly_adds.idxmax()
-    most_active_count = monthly_adds.max()
-
     # Growth last 12 months vs previous 12
     if len(monthly_adds) >= 24:
-        last_12 = monthly_adds[-12:].sum()
-        prev_12 = monthly_adds[-24:-12].sum()
+        last_12 = int(monthly_adds[-12:].sum())
+        prev_12 = int(monthly_adds[-24:-12].sum())
         growth_pct = ((last_12 - prev_12) / prev_12 * 100) if prev_12 > 0 else None
     else:
-        last_12, prev_12, growth_pct = None, None, None
+        last_12, growth_pct = None, None
+
+    stats = {
+        "avg_per_month": float(monthly_adds.mean()),
+        "busiest_month": monthly_adds.idxmax().strftime("%B %Y"),
+        "busiest_count": int(monthly_adds.max()),
+        "last_12": last_12,
+        "growth_pct": growth_pct,
+        "missing_added": int(d["added"].isna().sum()),
+    }
+
+    # cap what goes to the browser; monthly series only ever exceed this
+    # if the bucketing ever gets finer, but the guard is cheap
+    keep = lttb_downsample(monthly_adds.values)
+    idx = monthly_adds.index[keep]
+    # long form up front so px.line doesn't melt a wide frame internally
+    df_growth = pd.concat([
+        pd.DataFrame({"Month": idx, "Value": monthly_adds.values[keep], "Series": "New records"}),
+        pd.DataFrame({"Month": idx, "Value": cumulative.values[keep], "Series": "Cumulative"}),
+    ], ignore_index=True)
+
+    fig = px.line(
+        df_growth,
+        x="Month",
+        y="Value",
+        color="Series",
+        title=f"Discogs Collection Growth Over Time "
+              f"(showing {len(added)} / {len(d)} records)",
+        color_discrete_map={"New records": "#3498db", "Cumulative": "#e74c3c"}
+    )
+    return fig.to_dict(), stats
+
+
+growth = growth_chart(USERNAME)
+if growth is None:
+    st.warning("No valid 'date_added' found in your collection.")
+else:
+    fig_growth_dict, growth_stats = growth
 
     # --- Metrics Row ---
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("📊 Avg per Month", f"{avg_per_month:.1f}")
+        st.metric("📊 Avg per Month", f"{growth_stats['avg_per_month']:.1f}")
     with col2:
-        st.metric("🔥 Busiest Month", f"{most_active_count} records", str(most_active_month.strftime("%B %Y")))
+        st.metric("🔥 Busiest Month", f"{growth_stats['busiest_count']} records", growth_stats["busiest_month"])
     with col3:
-        if growth_pct is not None:
-            st.metric("📈 Last 12M Growth", f"{last_12} records", f"{growth_pct:+.1f}% vs prev 12M")
+        if growth_stats["growth_pct"] is not None:
+            st.metric("📈 Last 12M Growth", f"{growth_stats['last_12']} records",
+                      f"{growth_stats['growth_pct']:+.1f}% vs prev 12M")
         else:
             st.metric("📈 Last 12M Growth", "N/A")
 
-    # --- Plot ---
-    df_growth = pd.DataFrame({
-        "Month": monthly_adds.index,
-        "New records": monthly_adds.values,
-        "Cumulative": cumulative.values
-    })
+    st.plotly_chart(go.Figure(fig_growth_dict), use_container_width=True, key="growth_chart")
 
-    fig_growth = px.line(
-        df_growth,
-        x="Month",
-        y=["New records", "Cumulative"],
-        title=f"Discogs Collection Growth Over Time "
-              f"(showing {len(df_time)} / {len(df_filtered)} records)",
-        color_discrete_map={"New records": "#3498db", "Cumulative": "#e74c3c"}
-    )
-    st.plotly_chart(fig_growth, use_container_width=True)
-
-    if missing_added > 0:
-        st.info(f"⚠️ {missing_added} records had no parseable 'date_added' "
+    if growth_stats["missing_added"] > 0:
+        st.info(f"⚠️ {growth_stats['missing_added']} records had no parseable 'date_added' "
                 f"and are excluded from the growth chart.")
 
 
@@ -552,33 +804,24 @@ else:
 # --------------------------
 DISCOGS_API_BASE = "https://api.discogs.com"
 
+@st.cache_data(ttl=86400, show_spinner=False, persist="disk")
 def fetch_release_videos(release_id):
-    """Fetch video links from Discogs release API."""
+    """Fetch video links from Discogs release API (cached for a day)."""
     url = f"{DISCOGS_API_BASE}/releases/{release_id}"
     try:
-        r = requests.get(url)
+        r = SESSION.get(url, timeout=5)
         r.raise_for_status()
-        data = r.json()
-        videos = data.get("videos", [])
-        return [{"title": v.get("title"), "uri": v.get("uri")} for v in videos]
+        return r.json().get("videos", [])
     except Exception as e:
         st.warning(f"Could not fetch videos for release {release_id}: {e}")
         return []
 
-if "all_covers" not in st.session_state:
-    st.session_state.all_covers = df.dropna(subset=["cover_url"])
-
-col1, col2 = st.sidebar.columns([5, 1])
-with col1:
-    st.markdown("### 🎨 Random Album")
-with col2:
-    if st.button("🔄", key="reload_album"):
-        st.session_state.random_album = None
+@st.cache_data(show_spinner=False)
+def cover_index(username):
+    """Row labels that have a cover image, for O(1) random picks."""
+    d = preprocess(username)
+    return d.index[d["cover_url"].notna()].to_numpy()
 
-if "random_album" not in st.session_state or st.session_state.random_album is None:
-    st.session_state.random_album = st.session_state.all_covers.sample(1).iloc[0]
-
-album = st.session_state.random_album
 
 def clean_name(value):
     if not value or str(value).lower() == "nan":
@@ -587,37 +830,73 @@ def clean_name(value):
         return " / ".join(str(v).split(" (")[0] for v in value)
     return str(value).split(" (")[0]
 
-cover_url = album.get("cover_url", "")
-release_id = album.get("release_id", "")
-artist = clean_name(album.get("artists", album.get("artist", "Unknown")))
-title = album.get("title", "Unknown")
-label = clean_name(album.get("labels", album.get("label", "Unknown")))
-year = album.get("year", "Unknown")
-link = f"https://www.discogs.com/release/{release_id}"
-
-st.sidebar.markdown(
-    f"""
-    <div style="text-align:center;">
-        <a href="{link}" target="_blank">
-            <img src="{cover_url}" style="width:100%; border-radius:8px; margin-bottom:8px;
-            box-shadow: 0 2px 6px rgba(0,0,0,0.2);"/>
-        </a>
-        <p><b>{artist}</b><br>{title}<br>
-        <span style="color:gray; font-size:90%;">{label}, {year}</span></p>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
 
-videos = fetch_release_videos(release_id)
-if videos:
-    st.sidebar.markdown("#### 🎥 Videos")
-    for v in videos:
-        uri = v.get("uri")
-        if uri and ("youtube.com" in uri or "youtu.be" in uri):
-            st.sidebar.video(uri)
-        elif uri:
-            st.sidebar.markdown(f"- [{v.get('title')}]({uri})")
+def _reroll_album():
+    """on_click callback: clears the pick before the fragment reruns."""
+    st.session_state.random_album = None
+
+
+# Fragment: the reload button re-picks the album without rerunning (and
+# redrawing) the rest of the dashboard
+@st.fragment
+def render_random_album():
+    valid_cover_idx = cover_index(USERNAME)
+
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        st.markdown("### 🎨 Random Album")
+    with col2:
+        st.button("🔄", key="reload_album", on_click=_reroll_album)
+
+    # session_state keeps only the picked row label; the row itself is a
+    # single .loc lookup, not a sampled sub-frame
+    if "random_album" not in st.session_state or st.session_state.random_album is None:
+        st.session_state.random_album = _RNG.choice(valid_cover_idx)
+
+    album = df.loc[st.session_state.random_album]
+
+    cover_url = album.get("cover_url", "")
+    release_id = album.get("release_id", "")
+    artist = clean_name(album.get("artists", album.get("artist", "Unknown")))
+    title = album.get("title", "Unknown")
+    label = clean_name(album.get("labels", album.get("label", "Unknown")))
+    year = album.get("year", "Unknown")
+    link = f"https://www.discogs.com/release/{release_id}"
+
+    st.markdown(
+        f"""
+        <div style="text-align:center;">
+            <a href="{link}" target="_blank">
+                <img src="{cover_url}" style="width:100%; border-radius:8px; margin-bottom:8px;
+                box-shadow: 0 2px 6px rgba(0,0,0,0.2);"/>
+            </a>
+            <p><b>{artist}</b><br>{title}<br>
+            <span style="color:gray; font-size:90%;">{label}, {year}</span></p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    videos = fetch_release_videos(release_id)
+    if videos:
+        st.markdown("#### 🎥 Videos")
+        links = []
+        for v in videos:
+            uri = v.get("uri")
+            if uri and ("youtube.com" in uri or "youtu.be" in uri):
+                st.video(uri)
+            elif uri:
+                links.append(f"- [{v.get('title')}]({uri})")
+        if links:
+            # one markdown element for all plain links instead of one
+            # delta round-trip per link
+            st.markdown("\n".join(links))
+
+
+# Fragments cannot call st.sidebar.* directly; entering the sidebar
+# container here keeps the fragment's plain st.* elements inside it
+with st.sidebar:
+    render_random_album()
 
 st.markdown(
     """